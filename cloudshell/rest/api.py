@@ -1,16 +1,26 @@
 from __future__ import annotations
 
-import os
-from collections.abc import Generator
+import threading
+from collections.abc import Callable, Generator, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing.io import BinaryIO
-from urllib.parse import urljoin
+from types import MappingProxyType
+from typing import BinaryIO
+from urllib.parse import quote, urlencode
 
 import requests
 from attrs import define, field
+from requests.adapters import HTTPAdapter
 from typing_extensions import Self
+from urllib3.util.retry import Retry
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
 
 from cloudshell.rest.exceptions import (
+    BulkOperationError,
     FeatureUnavailable,
     LoginFailedError,
     PackagingRestApiError,
@@ -20,6 +30,43 @@ from cloudshell.rest.models import ShellInfo, StandardInfo
 from cloudshell.rest.progress_bar import iter_resp_with_pb, upload_with_pb
 
 DEFAULT_API_TIMEOUT = 15
+DEFAULT_POOL_MAXSIZE = 50
+DEFAULT_BULK_WORKERS = 10
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# HTTP status codes that mean a specific error, any other unexpected status
+# is reported as PackagingRestApiError
+_NO_ERRORS: Mapping[int, type[PackagingRestApiError]] = MappingProxyType({})
+_LOGIN_ERRORS = MappingProxyType({401: LoginFailedError})
+_FEATURE_ERRORS = MappingProxyType({404: FeatureUnavailable})
+_SHELL_ERRORS = MappingProxyType({404: FeatureUnavailable, 400: ShellNotFound})
+_UPDATE_SHELL_ERRORS = MappingProxyType({404: ShellNotFound})
+_LOGIN_HEADERS = MappingProxyType({"Content-Type": "application/x-www-form-urlencoded"})
+
+
+def _get_api_url(host: str, port: int) -> str:
+    return f"http://{host}:{port}/API/"
+
+
+def _get_auth_url(api_url: str) -> str:
+    return api_url + "Auth/Login"
+
+
+def _create_session(pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    session = requests.Session()
+    # uploads send a non-rewindable multipart stream, so only the requests
+    # without a body are re-sent on the gateway errors
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "DELETE"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 @define
@@ -29,12 +76,39 @@ class PackagingRestApiClient:
     port: int = 9000
     _show_progress: bool = field(default=False, repr=False)
     _api_timeout: int = field(default=DEFAULT_API_TIMEOUT, repr=False)
+    _pool_maxsize: int | None = field(default=None, repr=False)
+    _session: requests.Session | None = field(default=None, repr=False)
+    _close_session: bool = field(init=False, repr=False)
+    _auth_headers: Mapping[str, str] = field(init=False, repr=False)
     _api_url: str = field(init=False)
-    _headers: dict[str, str] = field(init=False)
+    _auth_url: str = field(init=False, repr=False)
+    _shells_url: str = field(init=False, repr=False)
+    _standards_url: str = field(init=False, repr=False)
+    _export_package_url: str = field(init=False, repr=False)
+    _import_package_url: str = field(init=False, repr=False)
+    _login_body: bytes | None = field(default=None, init=False, repr=False)
+    _token_lock: threading.Lock = field(factory=threading.Lock, init=False, repr=False)
 
     def __attrs_post_init__(self):
         self._api_url = _get_api_url(self.host, self.port)
-        self._headers = {"Authorization": f"Basic {self._token}"}
+        self._auth_url = _get_auth_url(self._api_url)
+        self._shells_url = self._api_url + "Shells"
+        self._standards_url = self._api_url + "Standards"
+        self._export_package_url = self._api_url + "Package/ExportPackage"
+        self._import_package_url = self._api_url + "Package/ImportPackage"
+        self._auth_headers = _get_auth_headers(self._token)
+        _check_pool_maxsize(self._session, self._pool_maxsize)
+        # a session passed by the caller can be shared, it's closed by the caller
+        self._close_session = self._session is None
+        if self._session is None:
+            self._pool_maxsize = self._pool_maxsize or DEFAULT_POOL_MAXSIZE
+            self._session = _create_session(self._pool_maxsize)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
 
     @classmethod
     def login(
@@ -46,37 +120,157 @@ class PackagingRestApiClient:
         port: int = 9000,
         show_progress: bool = False,
         api_timeout: int = DEFAULT_API_TIMEOUT,
+        pool_maxsize: int | None = None,
+        session: requests.Session | None = None,
     ) -> Self:
-        url = urljoin(_get_api_url(host, port), "Auth/Login")
-        req_data = {
-            "username": username,
-            "password": password,
-            "domain": domain,
-        }
-        resp = requests.put(url, data=req_data, timeout=api_timeout)
-        if resp.status_code == 401:
-            raise LoginFailedError(resp.text)
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
-        token = resp.text.strip("'\"")
-        return cls(
-            host, token, port, show_progress=show_progress, api_timeout=api_timeout
+        """Login with the credentials and create the client.
+
+        A session passed to the method is used for the login and by the client,
+        it's left open when the client is closed. The pool size of a passed
+        session is set by its adapter, so pool_maxsize can't be used with it.
+        """
+        _check_pool_maxsize(session, pool_maxsize)
+        url = _get_auth_url(_get_api_url(host, port))
+        login_body = urlencode(
+            {"username": username, "password": password, "domain": domain}
+        ).encode()
+        # the login connection is kept in the session and reused by the client
+        close_session = session is None
+        if close_session:
+            session = _create_session(pool_maxsize or DEFAULT_POOL_MAXSIZE)
+        try:
+            token = _get_token(session, url, login_body, api_timeout)
+        except Exception:
+            if close_session:
+                session.close()
+            raise
+        client = cls(
+            host,
+            token,
+            port,
+            show_progress=show_progress,
+            api_timeout=api_timeout,
+            session=session,
         )
+        if close_session:
+            client._close_session = True
+            client._pool_maxsize = pool_maxsize or DEFAULT_POOL_MAXSIZE
+        # the encoded form is kept to login again when the token expires
+        client._login_body = login_body
+        return client
 
-    def add_shell_from_buffer(self, file_obj: BinaryIO | bytes) -> None:
-        """Add a new Shell from the buffer or binary."""
-        url = urljoin(self._api_url, "Shells")
-        req_data = {"files": ("file", file_obj)}
-        headers = self._headers.copy()
+    def close(self) -> None:
+        """Close the HTTP session and release the pooled connections.
 
+        A session passed to the client is left open.
+        """
+        if self._close_session:
+            self._session.close()
+
+    def _get_shell_url(self, shell_name: str) -> str:
+        return f"{self._shells_url}/{quote(shell_name, safe='')}"
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        file_obj: BinaryIO | bytes | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Send the request, login again and resend it once if the token expired.
+
+        The file object is uploaded as multipart form data.
+        """
+        token = self._token
+        # an uploaded file can be sent again only if it can be rewound
+        file_pos = None
+        can_resend = file_obj is None or isinstance(file_obj, bytes)
+        if not can_resend and file_obj.seekable():
+            file_pos = file_obj.tell()
+            can_resend = True
+
+        resp = self._send(method, url, file_obj, **kwargs)
+        if resp.status_code == 401 and can_resend and self._refresh_token(token):
+            resp.close()
+            if file_pos is not None:
+                file_obj.seek(file_pos)
+            resp = self._send(method, url, file_obj, **kwargs)
+        return resp
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        file_obj: BinaryIO | bytes | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        if file_obj is None:
+            return self._session.request(
+                method,
+                url,
+                headers=self._auth_headers,
+                timeout=self._api_timeout,
+                **kwargs,
+            )
+
+        req_data = {"files": ("file", file_obj)}
+        headers = dict(self._auth_headers)
         with upload_with_pb(req_data, headers, show=self._show_progress) as new_data:
-            resp = requests.post(
-                url, data=new_data, headers=headers, timeout=self._api_timeout
+            return self._session.request(
+                method,
+                url,
+                data=new_data,
+                headers=headers,
+                timeout=self._api_timeout,
+                **kwargs,
             )
 
-        if resp.status_code != 201:
-            msg = f"Can't add shell, response: {resp.text}"
-            raise PackagingRestApiError(msg)
+    def _refresh_token(self, expired_token: str) -> bool:
+        """Login again if the client was created with the credentials.
+
+        Concurrent callers that got the same expired token login only once.
+        """
+        if self._login_body is None:
+            return False
+        with self._token_lock:
+            if self._token == expired_token:
+                self._token = _get_token(
+                    self._session, self._auth_url, self._login_body, self._api_timeout
+                )
+                self._auth_headers = _get_auth_headers(self._token)
+        return True
+
+    def _run_bulk(self, func: Callable, items: Iterable, max_workers: int) -> list:
+        """Call the function for every item in the thread pool.
+
+        Results are returned in the order of the items. If any call fails
+        BulkOperationError with every failed item is raised once all the calls
+        are finished. When the client created the session the number of workers
+        is limited by its connection pool size, so that every worker keeps its
+        connection. For a session passed by the caller max_workers is used as
+        given, the caller sizes the session's pool.
+        """
+        items = list(items)
+        if self._pool_maxsize is not None:
+            max_workers = min(max_workers, self._pool_maxsize)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+
+        results = []
+        errors = []
+        for item, future in zip(items, futures):
+            err = future.exception()
+            if err is not None:
+                errors.append((item, err))
+            results.append(future.result() if err is None else err)
+        if errors:
+            raise BulkOperationError(errors, results)
+        return results
+
+    def add_shell_from_buffer(self, file_obj: BinaryIO | bytes) -> None:
+        """Add a new Shell from the buffer or binary."""
+        resp = self._request("POST", self._shells_url, file_obj)
+        _check_response(resp, ok_status=201, msg_prefix="Can't add shell, response: ")
 
     def add_shell(self, shell_path: str | Path) -> None:
         """Adds a new Shell Entity to CloudShell.
@@ -86,42 +280,36 @@ class PackagingRestApiClient:
         with open(shell_path, "rb") as f:
             self.add_shell_from_buffer(f)
 
+    def bulk_add_shells(
+        self,
+        shell_paths: Iterable[str | Path],
+        max_workers: int = DEFAULT_BULK_WORKERS,
+    ) -> None:
+        """Adds several new Shell Entities to CloudShell concurrently."""
+        self._run_bulk(self.add_shell, shell_paths, max_workers)
+
     def update_shell_from_buffer(
         self, file_obj: BinaryIO | bytes, shell_name: str
     ) -> None:
         """Updates an existing Shell from the buffer or binary."""
-        url = urljoin(self._api_url, f"Shells/{shell_name}")
-        req_data = {"files": ("file", file_obj)}
-        headers = self._headers.copy()
-
-        with upload_with_pb(req_data, headers, show=self._show_progress) as new_data:
-            resp = requests.put(
-                url, data=new_data, headers=headers, timeout=self._api_timeout
-            )
-
-        if resp.status_code == 404:
-            raise ShellNotFound()
-        elif resp.status_code != 200:
-            msg = f"Can't update shell, response: {resp.text}"
-            raise PackagingRestApiError(msg)
+        resp = self._request("PUT", self._get_shell_url(shell_name), file_obj)
+        _check_response(
+            resp, _UPDATE_SHELL_ERRORS, msg_prefix="Can't update shell, response: "
+        )
 
     def update_shell(
         self, shell_path: str | Path, shell_name: str | None = None
     ) -> None:
         """Updates an existing Shell Entity in CloudShell."""
-        shell_name = shell_name or os.path.basename(shell_path).rsplit(".", 1)[0]
+        shell_name = shell_name or Path(shell_path).stem
         with open(shell_path, "rb") as f:
             self.update_shell_from_buffer(f, shell_name)
 
     def get_installed_standards(self) -> list[dict]:
         """Gets all standards installed on CloudShell."""
-        url = urljoin(self._api_url, "Standards")
-        resp = requests.get(url, headers=self._headers, timeout=self._api_timeout)
-        if resp.status_code == 404:
-            raise FeatureUnavailable()
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
-        return resp.json()
+        resp = self._request("GET", self._standards_url)
+        _check_response(resp, _FEATURE_ERRORS)
+        return _json_loads(resp.content)
 
     def get_installed_standards_as_models(self) -> list[StandardInfo]:
         """Get all standards installed on CloudShell as models."""
@@ -129,15 +317,15 @@ class PackagingRestApiClient:
 
     def get_shell(self, shell_name: str) -> dict:
         """Get a Shell's information."""
-        url = urljoin(self._api_url, f"Shells/{shell_name}")
-        resp = requests.get(url, headers=self._headers, timeout=self._api_timeout)
-        if resp.status_code == 404:
-            raise FeatureUnavailable()
-        elif resp.status_code == 400:
-            raise ShellNotFound()
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
-        return resp.json()
+        resp = self._request("GET", self._get_shell_url(shell_name))
+        _check_response(resp, _SHELL_ERRORS)
+        return _json_loads(resp.content)
+
+    def bulk_get_shells(
+        self, shell_names: Iterable[str], max_workers: int = DEFAULT_BULK_WORKERS
+    ) -> list[dict]:
+        """Get several Shells' information concurrently."""
+        return self._run_bulk(self.get_shell, shell_names, max_workers)
 
     def get_shell_as_model(self, shell_name: str) -> ShellInfo:
         """Get a Shell's information as model."""
@@ -145,57 +333,51 @@ class PackagingRestApiClient:
 
     def delete_shell(self, shell_name: str) -> None:
         """Delete a Shell from the CloudShell."""
-        url = urljoin(self._api_url, f"Shells/{shell_name}")
-        resp = requests.delete(url, headers=self._headers, timeout=self._api_timeout)
-        if resp.status_code == 404:
-            raise FeatureUnavailable()
-        elif resp.status_code == 400:
-            raise ShellNotFound()
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
-
-    def export_package(self, topologies: list[str]) -> Generator[bytes, None, None]:
-        """Export a package with the topologies from the CloudShell."""
-        url = urljoin(self._api_url, "Package/ExportPackage")
+        resp = self._request("DELETE", self._get_shell_url(shell_name))
+        _check_response(resp, _SHELL_ERRORS)
+
+    def bulk_delete_shells(
+        self, shell_names: Iterable[str], max_workers: int = DEFAULT_BULK_WORKERS
+    ) -> None:
+        """Delete several Shells from the CloudShell concurrently."""
+        self._run_bulk(self.delete_shell, shell_names, max_workers)
+
+    def export_package(
+        self, topologies: list[str], chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Generator[bytes, None, None]:
+        """Export a package with the topologies from the CloudShell.
+
+        The package is streamed and yielded in chunks of chunk_size bytes.
+        """
         req_data = {"TopologyNames": topologies}
-        resp = requests.post(
-            url,
-            headers=self._headers,
-            json=req_data,
-            stream=True,
-            timeout=self._api_timeout,
+        resp = self._request(
+            "POST", self._export_package_url, json=req_data, stream=True
         )
 
-        if resp.status_code == 404:
-            raise FeatureUnavailable()
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
+        # closing the response returns the connection to the pool even if
+        # the caller stops iterating early
+        with resp:
+            _check_response(resp, _FEATURE_ERRORS)
 
-        yield from iter_resp_with_pb(resp, show=self._show_progress)
+            yield from iter_resp_with_pb(
+                resp, show=self._show_progress, chunk=chunk_size
+            )
 
     def export_package_to_file(
-        self, topologies: list[str], file_path: str | Path
+        self,
+        topologies: list[str],
+        file_path: str | Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
     ) -> None:
         """Export a package with the topologies and save it to the file."""
         with open(file_path, "wb") as f:
-            for data in self.export_package(topologies):
+            for data in self.export_package(topologies, chunk_size):
                 f.write(data)
 
     def import_package_from_buffer(self, file_obj: BinaryIO | bytes) -> None:
         """Import the package from buffer to the CloudShell."""
-        url = urljoin(self._api_url, "Package/ImportPackage")
-        req_data = {"files": ("file", file_obj)}
-        headers = self._headers.copy()
-
-        with upload_with_pb(req_data, headers, show=self._show_progress) as new_data:
-            resp = requests.post(
-                url, data=new_data, headers=headers, timeout=self._api_timeout
-            )
-
-        if resp.status_code == 404:
-            raise FeatureUnavailable()
-        elif resp.status_code != 200:
-            raise PackagingRestApiError(resp.text)
+        resp = self._request("POST", self._import_package_url, file_obj)
+        _check_response(resp, _FEATURE_ERRORS)
 
     def import_package(self, package_path: str | Path) -> None:
         """Import the package from the file to the CloudShell."""
@@ -203,5 +385,38 @@ class PackagingRestApiClient:
             self.import_package_from_buffer(f)
 
 
-def _get_api_url(host: str, port: int) -> str:
-    return f"http://{host}:{port}/API/"
+def _check_pool_maxsize(
+    session: requests.Session | None, pool_maxsize: int | None
+) -> None:
+    if session is not None and pool_maxsize is not None:
+        raise ValueError(
+            "pool_maxsize can't be used with a session, "
+            "set the pool size in the session's adapter"
+        )
+
+
+def _get_auth_headers(token: str) -> Mapping[str, str]:
+    # read-only, as the same headers are passed to every request
+    return MappingProxyType({"Authorization": f"Basic {token}"})
+
+
+def _get_token(
+    session: requests.Session, url: str, login_body: bytes, timeout: int
+) -> str:
+    resp = session.put(url, data=login_body, headers=_LOGIN_HEADERS, timeout=timeout)
+    _check_response(resp, _LOGIN_ERRORS)
+    return resp.text.strip("'\"")
+
+
+def _check_response(
+    resp: requests.Response,
+    errors: Mapping[int, type[PackagingRestApiError]] = _NO_ERRORS,
+    ok_status: int = 200,
+    msg_prefix: str = "",
+) -> None:
+    if resp.status_code == ok_status:
+        return
+    error_class = errors.get(resp.status_code)
+    if error_class is not None:
+        raise error_class(resp.text)
+    raise PackagingRestApiError(f"{msg_prefix}{resp.text}")
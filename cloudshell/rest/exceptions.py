@@ -1,3 +1,6 @@
+from __future__ import annotations
+
+
 class PackagingRestApiError(Exception):
     """Base packaging REST API Error."""
 
@@ -12,3 +15,17 @@ class FeatureUnavailable(PackagingRestApiError):
 
 class LoginFailedError(PackagingRestApiError):
     pass
+
+
+class BulkOperationError(PackagingRestApiError):
+    """Some calls of a bulk operation failed.
+
+    errors lists the failed items with their exceptions in the order of the
+    items, results holds the result of every item or the exception it raised.
+    """
+
+    def __init__(self, errors: list[tuple[object, Exception]], results: list):
+        self.errors = errors
+        self.results = results
+        details = "; ".join(f"{item}: {err!r}" for item, err in errors)
+        super().__init__(f"{len(errors)} of {len(results)} items failed: {details}")
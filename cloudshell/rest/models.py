@@ -1,8 +1,27 @@
 from __future__ import annotations
 
+import sys
+from operator import itemgetter
+
 from attrs import define, field
 from typing_extensions import Self
 
+_get_user_info = itemgetter("Username", "Email")
+_get_execution_environment_type = itemgetter("Position", "Path")
+_get_shell_info = itemgetter(
+    "Id",
+    "Name",
+    "Version",
+    "StandardType",
+    "ModificationDate",
+    "LastModifiedByUser",
+    "Author",
+    "IsOfficial",
+    "BasedOn",
+    "ExecutionEnvironmentType",
+)
+_get_standard_info = itemgetter("StandardName", "Versions")
+
 
 @define
 class UserInfo:
@@ -11,10 +30,8 @@ class UserInfo:
 
     @classmethod
     def from_dict(cls, info_dict: dict) -> Self:
-        return cls(
-            user_name=info_dict["Username"],
-            email=info_dict["Email"],
-        )
+        user_name, email = _get_user_info(info_dict)
+        return cls(user_name=user_name, email=email)
 
 
 @define
@@ -24,10 +41,8 @@ class ExecutionEnvironmentType:
 
     @classmethod
     def from_dict(cls, info_dict: dict) -> Self:
-        return cls(
-            position=info_dict["Position"],
-            path=info_dict["Path"],
-        )
+        position, path = _get_execution_environment_type(info_dict)
+        return cls(position=position, path=path)
 
 
 @define
@@ -45,18 +60,30 @@ class ShellInfo:
 
     @classmethod
     def from_dict(cls, info_dict: dict) -> Self:
+        (
+            id_,
+            name,
+            version,
+            standard_type,
+            modification_date,
+            last_modified_by_user,
+            author,
+            is_official,
+            based_on,
+            execution_environment_type,
+        ) = _get_shell_info(info_dict)
         return cls(
-            id=info_dict["Id"],
-            name=info_dict["Name"],
-            version=info_dict["Version"],
-            standard_type=info_dict["StandardType"],
-            modification_date=info_dict["ModificationDate"],
-            last_modified_by_user=UserInfo.from_dict(info_dict["LastModifiedByUser"]),
-            author=info_dict["Author"],
-            is_official=info_dict["IsOfficial"],
-            based_on=info_dict["BasedOn"],
+            id=id_,
+            name=name,
+            version=version,
+            standard_type=standard_type,
+            modification_date=modification_date,
+            last_modified_by_user=UserInfo.from_dict(last_modified_by_user),
+            author=author,
+            is_official=is_official,
+            based_on=based_on,
             execution_environment_type=ExecutionEnvironmentType.from_dict(
-                info_dict["ExecutionEnvironmentType"]
+                execution_environment_type
             ),
         )
 
@@ -68,7 +95,6 @@ class StandardInfo:
 
     @classmethod
     def from_dict(cls, info_dict: dict) -> Self:
-        return cls(
-            standard_name=info_dict["StandardName"],
-            versions=info_dict["Versions"],
-        )
+        standard_name, versions = _get_standard_info(info_dict)
+        # standard names are a small set repeated in every response
+        return cls(standard_name=sys.intern(standard_name), versions=versions)
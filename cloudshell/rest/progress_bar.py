@@ -3,7 +3,6 @@ from __future__ import annotations
 from collections.abc import Generator
 from contextlib import contextmanager
 
-from alive_progress import alive_bar
 from requests import Response
 from requests_toolbelt import MultipartEncoder, MultipartEncoderMonitor
 
@@ -15,13 +14,18 @@ def iter_resp_with_pb(
 
     The request should be streaming.
     """
+    if not show:
+        yield from resp.iter_content(chunk_size=chunk)
+        return
+
+    from alive_progress import alive_bar
+
     total = int(resp.headers.get("content-length", 0))
 
     pb_context = alive_bar(
         total,
         unit="B",
         scale=True,
-        disable=not show,
     )
 
     with pb_context as bar:
@@ -39,11 +43,17 @@ def upload_with_pb(data: dict, headers: dict, show: bool = True):
     Updates the headers with the new content type.
     """
     e = MultipartEncoder(data)
+    if not show:
+        headers["Content-Type"] = e.content_type
+        yield e
+        return
+
+    from alive_progress import alive_bar
+
     pb_context = alive_bar(
         e.len,
         unit="B",
         scale=True,
-        disable=not show,
     )
 
     with pb_context as bar:
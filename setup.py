@@ -21,6 +21,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=get_file_content("requirements.txt"),
+    extras_require={"orjson": ["orjson>=3,<4"]},
     license="Apache Software License 2.0",
     zip_safe=False,
     keywords="cloudshell quali sandbox cloud rest api",
@@ -29,10 +30,13 @@ setup(
         "Intended Audience :: Developers",
         "License :: OSI Approved :: Apache Software License",
         "Natural Language :: English",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
     ],
     test_suite="tests",
     tests_require=get_file_content("test_requirements.txt"),
-    python_requires="~=3.7",
+    python_requires=">=3.8,<4",
 )
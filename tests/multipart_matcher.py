@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-import re
-
 from requests import Request
 
 
 def file_matcher(file_name: str, file_content: bytes):
-    name_pattern = re.compile(rf"filename=[\"']{file_name}[\"']".encode())
-    content_pattern = re.compile(rb"\s" + file_content + rb"\s")
+    name_patterns = (
+        f'filename="{file_name}"'.encode(),
+        f"filename='{file_name}'".encode(),
+    )
+    # multipart parts are delimited with CRLF
+    content_pattern = b"\r\n" + file_content + b"\r\n"
 
     def match(req: Request) -> tuple[bool, str]:
-        body = req.body.to_string()
+        body = req.body
+        if not isinstance(body, bytes):
+            body = body.to_string()
 
-        if not name_pattern.search(body) or not content_pattern.search(body):
+        if not any(p in body for p in name_patterns) or content_pattern not in body:
             res = (False, "File not found in request")
         else:
             res = (True, "")
@@ -1,12 +1,21 @@
+from __future__ import annotations
+
+import importlib.util
 import io
 import json
-from urllib.parse import parse_qs, urljoin
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs
 
 import pytest
+import requests
 import responses
 
+import cloudshell.rest.api as api_module
 from cloudshell.rest.api import PackagingRestApiClient
 from cloudshell.rest.exceptions import (
+    BulkOperationError,
     FeatureUnavailable,
     LoginFailedError,
     PackagingRestApiError,
@@ -22,466 +31,770 @@ PASSWORD = "password"
 DOMAIN = "Global"
 TOKEN = "token"
 API_URL = f"http://{HOST}:{PORT}/API/"
+AUTH_URL = API_URL + "Auth/Login"
+SHELLS_URL = API_URL + "Shells"
+STANDARDS_URL = API_URL + "Standards"
+EXPORT_URL = API_URL + "Package/ExportPackage"
+IMPORT_URL = API_URL + "Package/ImportPackage"
+EXPECTED_LOGIN_QS = {"username": [USERNAME], "domain": [DOMAIN], "password": [PASSWORD]}
+TOPOLOGIES = ["topology"]
+EXPECTED_EXPORT_BODY = json.dumps({"TopologyNames": TOPOLOGIES}).encode()
+
+SHELL_INFO = {
+    "Id": "5889f189-ecdd-404a-b6ff-b3d1e01a4cf3",
+    "Name": "shell_name",
+    "Version": "2.0.1",
+    "StandardType": "Networking",
+    "ModificationDate": "2020-03-02T15:42:47",
+    "LastModifiedByUser": {"Username": "admin", "Email": None},
+    "Author": "Quali",
+    "IsOfficial": True,
+    "BasedOn": "",
+    "ExecutionEnvironmentType": {"Position": 0, "Path": "2.7.10"},
+}
+STANDARDS = [
+    {
+        "StandardName": "cloudshell_firewall_standard",
+        "Versions": ["3.0.0", "3.0.1", "3.0.2"],
+    },
+    {
+        "StandardName": "cloudshell_networking_standard",
+        "Versions": ["5.0.0", "5.0.1", "5.0.2", "5.0.3", "5.0.4"],
+    },
+]
+
+ERR_ARGNAMES = ("status_code", "err_msg", "expected_err_class", "expected_err_text")
+FEATURE_UNAVAILABLE_CASE = (404, "", FeatureUnavailable, "")
+SHELL_NOT_FOUND_CASE = (400, "", ShellNotFound, "")
+SERVER_ERROR_CASE = (
+    500,
+    "Internal server error",
+    PackagingRestApiError,
+    "Internal server error",
+)
+FEATURE_FAIL_CASES = (FEATURE_UNAVAILABLE_CASE, SERVER_ERROR_CASE)
+SHELL_FAIL_CASES = (FEATURE_UNAVAILABLE_CASE, SHELL_NOT_FOUND_CASE, SERVER_ERROR_CASE)
 
 
-@pytest.fixture
+def shell_url(name: str) -> str:
+    return f"{SHELLS_URL}/{name}"
+
+
+@pytest.fixture(scope="session")
 def rest_api_client():
-    return PackagingRestApiClient(HOST, TOKEN)
+    with PackagingRestApiClient(HOST, TOKEN) as client:
+        yield client
 
 
-def test_login():
-    with responses.RequestsMock() as rsps:
-        body = f"'{TOKEN}'"
-        rsps.put(urljoin(API_URL, "Auth/Login"), body=body)
+class FakeFile(io.BytesIO):
+    """In-memory file that saves the written content when closed."""
 
-        api = PackagingRestApiClient.login(
-            HOST, USERNAME, PASSWORD, domain=DOMAIN, port=PORT
-        )
-        assert api._token == TOKEN
+    def __init__(self, files: dict[str, bytes], path: str, mode: str):
+        self._files = files
+        self._path = path
+        self._write = "w" in mode
+        super().__init__(b"" if self._write else files[path])
 
-        assert len(rsps.calls) == 1
-        req = rsps.calls[0].request
+    def close(self):
+        if self._write and not self.closed:
+            self._files[self._path] = self.getvalue()
+        super().close()
 
-    body = "username={USERNAME}&domain={DOMAIN}&password={PASSWORD}".format(**globals())
-    assert parse_qs(req.body) == parse_qs(body)
 
+@pytest.fixture
+def fake_files(monkeypatch):
+    files = {}
 
-@pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (401, "", LoginFailedError, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
-    ),
-)
-def test_login_failed(status_code, err_msg, expected_err_class, expected_err_text):
-    url = urljoin(API_URL, "Auth/Login")
-    with responses.RequestsMock() as rsps:
-        rsps.put(url, body=err_msg, status=status_code)
-
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
-
-
-def test_get_installed_standards(rest_api_client):
-    standards = [
-        {
-            "StandardName": "cloudshell_firewall_standard",
-            "Versions": ["3.0.0", "3.0.1", "3.0.2"],
-        },
-        {
-            "StandardName": "cloudshell_networking_standard",
-            "Versions": ["5.0.0", "5.0.1", "5.0.2", "5.0.3", "5.0.4"],
-        },
-    ]
-    url = urljoin(API_URL, "Standards")
+    def fake_open(path, mode="r"):
+        return FakeFile(files, str(path), mode)
 
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, json=standards)
+    monkeypatch.setattr("cloudshell.rest.api.open", fake_open, raising=False)
+    return files
 
-        assert rest_api_client.get_installed_standards() == standards
 
+@pytest.fixture(scope="session")
+def responses_mock():
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as mock:
+        yield mock
 
-def test_get_installed_standards_as_models(rest_api_client):
-    standards = [
-        {
-            "StandardName": "cloudshell_firewall_standard",
-            "Versions": ["3.0.0", "3.0.1", "3.0.2"],
-        },
-        {
-            "StandardName": "cloudshell_networking_standard",
-            "Versions": ["5.0.0", "5.0.1", "5.0.2", "5.0.3", "5.0.4"],
-        },
+
+@pytest.fixture
+def rsps(responses_mock):
+    yield responses_mock
+    not_called = [
+        (m.method, m.url) for m in responses_mock.registered() if not m.call_count
     ]
-    url = urljoin(API_URL, "Standards")
+    responses_mock.reset()
+    assert not not_called, f"Not all requests have been executed {not_called!r}"
 
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, json=standards)
 
-        models = rest_api_client.get_installed_standards_as_models()
+def test_login(rsps):
+    body = f"'{TOKEN}'"
+    rsps.put(AUTH_URL, body=body)
 
-    for i in range(2):
-        assert models[i].standard_name == standards[i]["StandardName"]
-        assert models[i].versions == standards[i]["Versions"]
-    m = models[0]
+    api = PackagingRestApiClient.login(
+        HOST, USERNAME, PASSWORD, domain=DOMAIN, port=PORT
+    )
+    assert api._token == TOKEN
+
+    assert len(rsps.calls) == 1
+    req = rsps.calls[0].request
+
+    assert req.headers["Content-Type"] == "application/x-www-form-urlencoded"
+    assert parse_qs(req.body.decode()) == EXPECTED_LOGIN_QS
+
+
+def test_login_again_when_token_expired(rsps):
+    new_token = "new_token"
+    login_url = AUTH_URL
+    url = STANDARDS_URL
+
+    rsps.put(login_url, body=f"'{TOKEN}'")
+    rsps.put(login_url, body=f"'{new_token}'")
+    rsps.get(url, status=401)
+    rsps.get(url, json=[])
+
+    api = PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
+    assert api.get_installed_standards() == []
+
+    assert len(rsps.calls) == 4
+    auth_header = rsps.calls[3].request.headers["Authorization"]
+    assert auth_header == f"Basic {new_token}"
+
+
+def test_upload_again_when_token_expired(rsps):
+    shell_name = "shell_name"
+    login_url = AUTH_URL
+    url = shell_url(shell_name)
+    file_content = b"test buffer"
+    buffer = io.BytesIO(file_content)
+
+    rsps.put(login_url, body=f"'{TOKEN}'")
+    rsps.put(url, status=401)
+
+    api = PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
+    rsps.put(url, match=[file_matcher("file", file_content)])
+    api.update_shell_from_buffer(buffer, shell_name)
+
+    assert len(rsps.calls) == 4
+
+
+def test_non_seekable_upload_not_sent_again_when_token_expired(rsps):
+    class NonSeekableFile(io.BytesIO):
+        def seekable(self):
+            return False
+
+    shell_name = "shell_name"
+    url = shell_url(shell_name)
+
+    rsps.put(AUTH_URL, body=f"'{TOKEN}'")
+    rsps.put(url, status=401, body="Token expired")
+
+    api = PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
+    with pytest.raises(PackagingRestApiError, match="Token expired"):
+        api.update_shell_from_buffer(NonSeekableFile(b"test buffer"), shell_name)
+
+    assert len(rsps.calls) == 2
+
+
+def test_login_again_fails_when_token_expired(rsps):
+    url = STANDARDS_URL
+
+    rsps.put(AUTH_URL, body=f"'{TOKEN}'")
+    rsps.put(AUTH_URL, status=401, body="Wrong credentials")
+    rsps.get(url, status=401)
+
+    api = PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
+    with pytest.raises(LoginFailedError, match="Wrong credentials"):
+        api.get_installed_standards()
+
+    assert len(rsps.calls) == 3
+
+
+def test_token_expired_without_credentials(rest_api_client, rsps):
+    url = STANDARDS_URL
+
+    rsps.get(url, status=401, body="Token expired")
+
+    with pytest.raises(PackagingRestApiError, match="Token expired"):
+        rest_api_client.get_installed_standards()
+
+    assert len(rsps.calls) == 1
+
+
+def test_clients_share_session(monkeypatch, rsps):
+    session = requests.Session()
+    closed = []
+    monkeypatch.setattr(session, "close", lambda: closed.append(True))
+    url = STANDARDS_URL
+
+    rsps.get(url, json=[])
+
+    rsps.put(AUTH_URL, body="token3")
+
+    for token in ("token1", "token2"):
+        with PackagingRestApiClient(HOST, token, session=session) as client:
+            client.get_installed_standards()
+    with PackagingRestApiClient.login(
+        HOST, USERNAME, PASSWORD, session=session
+    ) as client:
+        assert client._session is session
+        client.get_installed_standards()
+
+    auth_headers = [call.request.headers.get("Authorization") for call in rsps.calls]
+
+    assert auth_headers == ["Basic token1", "Basic token2", None, "Basic token3"]
+    assert closed == []
+
+
+def test_login_closes_own_session(monkeypatch, rsps):
+    closed = []
+    monkeypatch.setattr(requests.Session, "close", lambda self: closed.append(True))
+
+    rsps.put(AUTH_URL, body=TOKEN)
+
+    with PackagingRestApiClient.login(HOST, USERNAME, PASSWORD):
+        pass
+
+    assert closed == [True]
+
+
+def test_client_repr(rest_api_client):
     expected_repr = (
-        "StandardInfo(standard_name='cloudshell_firewall_standard', "
-        "versions=['3.0.0', '3.0.1', '3.0.2'])"
+        f"PackagingRestApiClient(host='{HOST}', port={PORT}, _api_url='{API_URL}')"
     )
-    assert str(m) == expected_repr
+
+    assert repr(rest_api_client) == expected_repr
+
+
+def test_pool_maxsize():
+    client = PackagingRestApiClient(HOST, TOKEN, pool_maxsize=5)
+
+    assert client._session.get_adapter(API_URL)._pool_maxsize == 5
+
+
+def test_pool_maxsize_with_session_fails():
+    session = requests.Session()
+
+    with pytest.raises(ValueError, match="pool_maxsize"):
+        PackagingRestApiClient(HOST, TOKEN, pool_maxsize=5, session=session)
+    with pytest.raises(ValueError, match="pool_maxsize"):
+        PackagingRestApiClient.login(
+            HOST, USERNAME, PASSWORD, pool_maxsize=5, session=session
+        )
+
+
+def test_get_retried_on_gateway_error(rest_api_client, rsps):
+    url = STANDARDS_URL
+
+    rsps.get(url, status=503)
+    rsps.get(url, json=[])
+
+    assert rest_api_client.get_installed_standards() == []
+    assert len(rsps.calls) == 2
+
+
+def test_client_closes_session(monkeypatch):
+    client = PackagingRestApiClient(HOST, TOKEN)
+    closed = []
+    monkeypatch.setattr(client._session, "close", lambda: closed.append(True))
+
+    with client as api:
+        assert api is client
+
+    assert closed == [True]
 
 
 @pytest.mark.parametrize(
-    ("status_code", "text_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", FeatureUnavailable, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
+    ERR_ARGNAMES, ((401, "", LoginFailedError, ""), SERVER_ERROR_CASE)
+)
+def test_login_failed(
+    status_code, err_msg, expected_err_class, expected_err_text, rsps
+):
+    url = AUTH_URL
+    rsps.put(url, body=err_msg, status=status_code)
+
+    with pytest.raises(expected_err_class, match=expected_err_text or None):
+        PackagingRestApiClient.login(HOST, USERNAME, PASSWORD)
+
+
+def _fail_params(name, method, url, call, cases):
+    return [
+        pytest.param(method, url, call, *case, id=f"{name}-{case[0]}") for case in cases
+    ]
+
+
+API_FAIL_CASES = (
+    *_fail_params(
+        "get_installed_standards",
+        responses.GET,
+        STANDARDS_URL,
+        lambda client: client.get_installed_standards(),
+        FEATURE_FAIL_CASES,
+    ),
+    *_fail_params(
+        "add_shell_from_buffer",
+        responses.POST,
+        SHELLS_URL,
+        lambda client: client.add_shell_from_buffer(b""),
+        (
+            (
+                500,
+                "Internal server error",
+                PackagingRestApiError,
+                "Can't add shell, response: Internal server error",
+            ),
+        ),
+    ),
+    *_fail_params(
+        "update_shell_from_buffer",
+        responses.PUT,
+        shell_url("shell_name"),
+        lambda client: client.update_shell_from_buffer(b"", "shell_name"),
+        (
+            (404, "", ShellNotFound, ""),
+            (
+                500,
+                "Internal server error",
+                PackagingRestApiError,
+                "Can't update shell, response: Internal server error",
+            ),
+        ),
+    ),
+    *_fail_params(
+        "get_shell",
+        responses.GET,
+        shell_url("shell_name"),
+        lambda client: client.get_shell("shell_name"),
+        SHELL_FAIL_CASES,
+    ),
+    *_fail_params(
+        "delete_shell",
+        responses.DELETE,
+        shell_url("shell_name"),
+        lambda client: client.delete_shell("shell_name"),
+        SHELL_FAIL_CASES,
+    ),
+    *_fail_params(
+        "export_package",
+        responses.POST,
+        EXPORT_URL,
+        lambda client: list(client.export_package(TOPOLOGIES)),
+        FEATURE_FAIL_CASES,
+    ),
+    *_fail_params(
+        "import_package_from_buffer",
+        responses.POST,
+        IMPORT_URL,
+        lambda client: client.import_package_from_buffer(io.BytesIO(b"test_buffer")),
+        FEATURE_FAIL_CASES,
     ),
 )
-def test_get_installed_standards_failed(
+
+
+@pytest.mark.parametrize(("method", "url", "call", *ERR_ARGNAMES), API_FAIL_CASES)
+def test_api_failure(
+    method,
+    url,
+    call,
     status_code,
-    text_msg,
+    err_msg,
     expected_err_class,
     expected_err_text,
     rest_api_client,
+    rsps,
 ):
-    url = urljoin(API_URL, "Standards")
+    rsps.add(method, url, status=status_code, body=err_msg)
+
+    with pytest.raises(expected_err_class, match=expected_err_text or None):
+        call(rest_api_client)
+
+
+def test_get_installed_standards(rest_api_client, rsps):
+    url = STANDARDS_URL
+
+    rsps.get(url, json=STANDARDS)
+
+    assert rest_api_client.get_installed_standards() == STANDARDS
+
+    auth_header = rsps.calls[0].request.headers["Authorization"]
+    assert auth_header == f"Basic {TOKEN}"
+
+
+def test_orjson_used_when_installed():
+    orjson = pytest.importorskip("orjson")
+
+    assert api_module._json_loads is orjson.loads
+
+
+def test_json_used_without_orjson(monkeypatch):
+    # makes the import of orjson fail even if it's installed
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    # a separate copy of the module, the imported one is left untouched
+    spec = importlib.util.find_spec("cloudshell.rest.api")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module._json_loads is json.loads
+
 
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, status=status_code, body=text_msg)
+@pytest.mark.parametrize("decoder", ("orjson", "json"))
+def test_json_responses_decoded(decoder, monkeypatch, rest_api_client, rsps):
+    loads = pytest.importorskip(decoder).loads
+    monkeypatch.setattr(api_module, "_json_loads", loads)
 
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            rest_api_client.get_installed_standards()
+    rsps.get(STANDARDS_URL, json=STANDARDS)
+    rsps.get(shell_url("shell_name"), json=SHELL_INFO)
 
+    assert rest_api_client.get_installed_standards() == STANDARDS
+    assert rest_api_client.get_shell("shell_name") == SHELL_INFO
 
-def test_add_shell_from_buffer(rest_api_client):
-    url = urljoin(API_URL, "Shells")
+
+def test_get_installed_standards_as_models(rest_api_client, rsps):
+    url = STANDARDS_URL
+
+    rsps.get(url, json=STANDARDS)
+
+    models = rest_api_client.get_installed_standards_as_models()
+
+    for i in range(2):
+        assert models[i].standard_name == STANDARDS[i]["StandardName"]
+        assert models[i].versions == STANDARDS[i]["Versions"]
+    m = models[0]
+    expected_repr = (
+        "StandardInfo(standard_name='cloudshell_firewall_standard', "
+        "versions=['3.0.0', '3.0.1', '3.0.2'])"
+    )
+    assert str(m) == expected_repr
+    assert not hasattr(m, "__dict__")
+
+
+def test_add_shell_from_buffer(rest_api_client, rsps):
+    url = SHELLS_URL
     file_content = b"test buffer"
     buffer = io.BytesIO(file_content)
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, status=201, match=[file_matcher("file", file_content)])
+    rsps.post(url, status=201, match=[file_matcher("file", file_content)])
+
+    rest_api_client.add_shell_from_buffer(buffer)
 
-        rest_api_client.add_shell_from_buffer(buffer)
+    assert len(rsps.calls) == 1
 
-        assert len(rsps.calls) == 1
 
+def test_add_shell_from_buffer_with_progress(rsps):
+    client = PackagingRestApiClient(HOST, TOKEN, show_progress=True)
+    url = SHELLS_URL
+    file_content = b"test buffer"
 
-def test_add_shell_from_buffer_fails(rest_api_client):
-    url = urljoin(API_URL, "Shells")
-    err_msg = "Internal server error"
-    expected_err = f"Can't add shell, response: {err_msg}"
+    rsps.post(url, status=201, match=[file_matcher("file", file_content)])
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, status=500, body=err_msg)
+    client.add_shell_from_buffer(io.BytesIO(file_content))
 
-        with pytest.raises(PackagingRestApiError, match=expected_err):
-            rest_api_client.add_shell_from_buffer(b"")
+    assert len(rsps.calls) == 1
 
 
-def test_add_shell(rest_api_client, tmp_path):
-    url = urljoin(API_URL, "Shells")
+def test_add_shell(rest_api_client, fake_files, rsps):
+    url = SHELLS_URL
 
     shell_name = "shell_name"
     file_name = f"{shell_name}.zip"
     file_content = b"test buffer"
-    shell_path = tmp_path / file_name
-    shell_path.write_bytes(file_content)
+    fake_files[file_name] = file_content
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, status=201, match=[file_matcher("file", file_content)])
+    rsps.post(url, status=201, match=[file_matcher("file", file_content)])
 
-        rest_api_client.add_shell(str(shell_path))
+    rest_api_client.add_shell(file_name)
 
-        assert len(rsps.calls) == 1
+    assert len(rsps.calls) == 1
 
 
-def test_update_shell_from_buffer(rest_api_client):
+def test_bulk_add_shells(rest_api_client, fake_files, rsps):
+    url = SHELLS_URL
+    file_content = b"test buffer"
+    shell_paths = [f"shell_{i}.zip" for i in range(3)]
+    for shell_path in shell_paths:
+        fake_files[shell_path] = file_content
+
+    rsps.post(url, status=201, match=[file_matcher("file", file_content)])
+
+    rest_api_client.bulk_add_shells(shell_paths)
+
+    assert len(rsps.calls) == 3
+
+
+def test_update_shell_from_buffer(rest_api_client, rsps):
     shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+    url = shell_url(shell_name)
 
     file_content = b"test buffer"
     buffer = io.BytesIO(file_content)
 
-    with responses.RequestsMock() as rsps:
-        rsps.put(url, match=[file_matcher("file", file_content)])
+    rsps.put(url, match=[file_matcher("file", file_content)])
 
-        rest_api_client.update_shell_from_buffer(buffer, shell_name)
+    rest_api_client.update_shell_from_buffer(buffer, shell_name)
 
-        assert len(rsps.calls) == 1
+    assert len(rsps.calls) == 1
 
 
 @pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", ShellNotFound, ""),
-        (
-            500,
-            "Internal server error",
-            PackagingRestApiError,
-            "Can't update shell, response: Internal server error",
-        ),
-    ),
+    "shell_path",
+    (Path("some/dir/shell_name.zip"), "some/dir/shell_name.zip"),
+    ids=("path", "str"),
 )
-def test_update_shell_from_buffer_fails(
-    status_code,
-    err_msg,
-    expected_err_class,
-    expected_err_text,
-    rest_api_client,
-):
-    shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+def test_update_shell(shell_path, rest_api_client, fake_files, rsps):
+    # the Shell name is taken from the file name without the directories
+    url = shell_url("shell_name")
+
+    file_content = b"test buffer"
+    fake_files[str(shell_path)] = file_content
 
-    with responses.RequestsMock() as rsps:
-        rsps.put(url, status=status_code, body=err_msg)
+    rsps.put(url, match=[file_matcher("file", file_content)])
 
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            rest_api_client.update_shell_from_buffer(b"", shell_name)
+    rest_api_client.update_shell(shell_path)
 
 
-def test_update_shell(rest_api_client, tmp_path):
+def test_get_shell(rest_api_client, rsps):
     shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+    url = shell_url(shell_name)
 
-    file_content = b"test buffer"
-    _ = io.BytesIO(file_content)
-    file_name = f"{shell_name}.zip"
-    file_content = b"test buffer"
-    shell_path = tmp_path / file_name
-    shell_path.write_bytes(file_content)
+    rsps.get(url, json=SHELL_INFO)
 
-    with responses.RequestsMock() as rsps:
-        rsps.put(url, match=[file_matcher("file", file_content)])
+    assert rest_api_client.get_shell(shell_name) == SHELL_INFO
 
-        rest_api_client.update_shell(str(shell_path))
 
+def test_bulk_get_shells(rest_api_client, rsps):
+    shell_names = [f"shell_{i}" for i in range(5)]
 
-def test_get_shell(rest_api_client):
-    shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
-    shell_info = {
-        "Id": "5889f189-ecdd-404a-b6ff-b3d1e01a4cf3",
-        "Name": shell_name,
-        "Version": "2.0.1",
-        "StandardType": "Networking",
-        "ModificationDate": "2020-03-02T15:42:47",
-        "LastModifiedByUser": {"Username": "admin", "Email": None},
-        "Author": "Quali",
-        "IsOfficial": True,
-        "BasedOn": "",
-        "ExecutionEnvironmentType": {"Position": 0, "Path": "2.7.10"},
-    }
-
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, json=shell_info)
-
-        assert rest_api_client.get_shell(shell_name) == shell_info
-
-
-def test_get_shell_as_model(rest_api_client):
+    for shell_name in shell_names:
+        url = shell_url(shell_name)
+        rsps.get(url, json={"Name": shell_name})
+
+    shells = rest_api_client.bulk_get_shells(shell_names, max_workers=2)
+
+    assert shells == [{"Name": shell_name} for shell_name in shell_names]
+
+
+@pytest.fixture
+def bulk_workers(monkeypatch):
+    workers = []
+
+    class Executor(ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            workers.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr("cloudshell.rest.api.ThreadPoolExecutor", Executor)
+    return workers
+
+
+def test_bulk_workers_limited_by_pool_size(bulk_workers, rsps):
+    client = PackagingRestApiClient(HOST, TOKEN, pool_maxsize=2)
+
+    rsps.delete(shell_url("shell_name"))
+
+    client.bulk_delete_shells(["shell_name"], max_workers=10)
+
+    assert bulk_workers == [2]
+
+
+def test_bulk_workers_limited_by_login_pool_size(bulk_workers, rsps):
+    rsps.put(AUTH_URL, body=TOKEN)
+    rsps.delete(shell_url("shell_name"))
+
+    client = PackagingRestApiClient.login(HOST, USERNAME, PASSWORD, pool_maxsize=2)
+    client.bulk_delete_shells(["shell_name"], max_workers=10)
+
+    assert bulk_workers == [2]
+
+
+def test_bulk_workers_not_limited_with_session(bulk_workers, rsps):
+    # the caller sizes the pool of its session
+    session = requests.Session()
+    client = PackagingRestApiClient(HOST, TOKEN, session=session)
+
+    rsps.delete(shell_url("shell_name"))
+
+    client.bulk_delete_shells(["shell_name"], max_workers=10)
+
+    assert bulk_workers == [10]
+
+
+def test_bulk_get_shells_fails(rest_api_client, rsps):
+    shell_names = ["shell_name", "missing_shell"]
+
+    rsps.get(shell_url("shell_name"), json={"Name": "shell_name"})
+    rsps.get(shell_url("missing_shell"), status=400)
+
+    with pytest.raises(BulkOperationError) as exc_info:
+        rest_api_client.bulk_get_shells(shell_names)
+
+    assert len(rsps.calls) == 2
+    ((item, err),) = exc_info.value.errors
+    assert item == "missing_shell"
+    assert isinstance(err, ShellNotFound)
+    assert exc_info.value.results == [{"Name": "shell_name"}, err]
+
+
+def test_bulk_delete_shells_reports_every_failure(rest_api_client, rsps):
+    rsps.delete(shell_url("a"), status=400)
+    rsps.delete(shell_url("b"), status=500, body="Internal server error")
+    rsps.delete(shell_url("c"))
+
+    with pytest.raises(BulkOperationError, match="2 of 3 items failed") as exc_info:
+        rest_api_client.bulk_delete_shells(["a", "b", "c"])
+
+    errors = exc_info.value.errors
+    assert [item for item, _ in errors] == ["a", "b"]
+    assert type(errors[0][1]) is ShellNotFound
+    assert type(errors[1][1]) is PackagingRestApiError
+    assert str(errors[1][1]) == "Internal server error"
+    assert exc_info.value.results[2] is None
+
+
+def test_get_shell_as_model(rest_api_client, rsps):
     shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
-    shell_info = {
-        "Id": "5889f189-ecdd-404a-b6ff-b3d1e01a4cf3",
-        "Name": shell_name,
-        "Version": "2.0.1",
-        "StandardType": "Networking",
-        "ModificationDate": "2020-03-02T15:42:47",
-        "LastModifiedByUser": {"Username": "admin", "Email": None},
-        "Author": "Quali",
-        "IsOfficial": True,
-        "BasedOn": "",
-        "ExecutionEnvironmentType": {"Position": 0, "Path": "2.7.10"},
-    }
+    url = shell_url(shell_name)
     expected_user_repr = "UserInfo(user_name='admin', email=None)"
     expected_exec_env_repr = "ExecutionEnvironmentType(position=0, path='2.7.10')"
     expected_shell_repr = (
         "ShellInfo(name='shell_name', version='2.0.1', is_official=True)"
     )
 
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, json=shell_info)
+    rsps.get(url, json=SHELL_INFO)
 
-        model = rest_api_client.get_shell_as_model(shell_name)
+    model = rest_api_client.get_shell_as_model(shell_name)
 
-    assert model.id == shell_info["Id"]
-    assert model.name == shell_info["Name"]
-    assert model.version == shell_info["Version"]
-    assert model.standard_type == shell_info["StandardType"]
-    assert model.modification_date == shell_info["ModificationDate"]
+    assert model.id == SHELL_INFO["Id"]
+    assert model.name == SHELL_INFO["Name"]
+    assert model.version == SHELL_INFO["Version"]
+    assert model.standard_type == SHELL_INFO["StandardType"]
+    assert model.modification_date == SHELL_INFO["ModificationDate"]
     assert (
         model.last_modified_by_user.user_name
-        == shell_info["LastModifiedByUser"]["Username"]
+        == SHELL_INFO["LastModifiedByUser"]["Username"]
     )
     assert (
-        model.last_modified_by_user.email == shell_info["LastModifiedByUser"]["Email"]
+        model.last_modified_by_user.email == SHELL_INFO["LastModifiedByUser"]["Email"]
     )
-    assert model.author == shell_info["Author"]
-    assert model.is_official == shell_info["IsOfficial"]
-    assert model.based_on == shell_info["BasedOn"]
+    assert model.author == SHELL_INFO["Author"]
+    assert model.is_official == SHELL_INFO["IsOfficial"]
+    assert model.based_on == SHELL_INFO["BasedOn"]
     assert (
         model.execution_environment_type.position
-        == shell_info["ExecutionEnvironmentType"]["Position"]
+        == SHELL_INFO["ExecutionEnvironmentType"]["Position"]
     )
     assert (
         model.execution_environment_type.path
-        == shell_info["ExecutionEnvironmentType"]["Path"]
+        == SHELL_INFO["ExecutionEnvironmentType"]["Path"]
     )
     assert str(model) == expected_shell_repr
+    for obj in (model, model.last_modified_by_user, model.execution_environment_type):
+        assert not hasattr(obj, "__dict__")
     assert str(model.last_modified_by_user) == expected_user_repr
     assert str(model.execution_environment_type) == expected_exec_env_repr
 
 
-@pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", FeatureUnavailable, ""),
-        (400, "", ShellNotFound, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
-    ),
-)
-def test_get_shell_fails(
-    status_code,
-    err_msg,
-    expected_err_class,
-    expected_err_text,
-    rest_api_client,
-):
-    shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+def test_get_shell_quotes_shell_name(rest_api_client, rsps):
+    shell_name = "vendor/shell name"
+    url = shell_url("vendor%2Fshell%20name")
 
-    with responses.RequestsMock() as rsps:
-        rsps.get(url, status=status_code)
+    rsps.get(url, json={"Name": shell_name})
 
-        with pytest.raises(expected_err_class):
-            rest_api_client.get_shell(shell_name)
+    assert rest_api_client.get_shell(shell_name) == {"Name": shell_name}
 
 
-def test_delete_shell(rest_api_client):
+def test_delete_shell(rest_api_client, rsps):
     shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+    url = shell_url(shell_name)
 
-    with responses.RequestsMock() as rsps:
-        rsps.delete(url)
+    rsps.delete(url)
 
-        rest_api_client.delete_shell(shell_name)
+    rest_api_client.delete_shell(shell_name)
 
 
-@pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", FeatureUnavailable, ""),
-        (400, "", ShellNotFound, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
-    ),
-)
-def test_delete_shell_fails(
-    status_code,
-    err_msg,
-    expected_err_class,
-    expected_err_text,
-    rest_api_client,
-):
-    shell_name = "shell_name"
-    url = urljoin(API_URL, f"Shells/{shell_name}")
+def test_bulk_delete_shells(rest_api_client, rsps):
+    shell_names = [f"shell_{i}" for i in range(3)]
 
-    with responses.RequestsMock() as rsps:
-        rsps.delete(url, status=status_code, body=err_msg)
+    for shell_name in shell_names:
+        rsps.delete(shell_url(shell_name))
 
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            rest_api_client.delete_shell(shell_name)
+    rest_api_client.bulk_delete_shells(shell_names)
 
+    assert len(rsps.calls) == 3
 
-def test_export_package(rest_api_client):
-    url = urljoin(API_URL, "Package/ExportPackage")
+
+def test_export_package(rest_api_client, rsps):
+    url = EXPORT_URL
     byte_data = b"package_data"
-    topologies = ["topology"]
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, byte_data)
+    rsps.post(url, byte_data)
 
-        data = b"".join(list(rest_api_client.export_package(topologies)))
-        assert data == byte_data
+    data = b"".join(list(rest_api_client.export_package(TOPOLOGIES)))
+    assert data == byte_data
 
-        assert len(rsps.calls) == 1
-        body = rsps.calls[0].request.body
+    assert len(rsps.calls) == 1
+    body = rsps.calls[0].request.body
 
-    assert body == json.dumps({"TopologyNames": topologies}).encode()
+    assert body == EXPECTED_EXPORT_BODY
 
 
-@pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", FeatureUnavailable, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
-    ),
-)
-def test_export_package_fails(
-    status_code,
-    err_msg,
-    expected_err_class,
-    expected_err_text,
-    rest_api_client,
-):
-    url = urljoin(API_URL, "Package/ExportPackage")
+def test_export_package_with_progress(rsps):
+    client = PackagingRestApiClient(HOST, TOKEN, show_progress=True)
+    url = EXPORT_URL
+    byte_data = b"package_data"
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, status=status_code, body=err_msg)
+    rsps.post(url, byte_data)
 
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            list(rest_api_client.export_package(["topology"]))
+    assert b"".join(client.export_package(["topology"])) == byte_data
 
 
-def test_export_package_to_file(rest_api_client, tmp_path):
-    url = urljoin(API_URL, "Package/ExportPackage")
+def test_export_package_in_chunks(rest_api_client, rsps):
+    url = EXPORT_URL
     byte_data = b"package_data"
-    topologies = ["topology"]
-    file_path = tmp_path / "package.zip"
 
-    with responses.RequestsMock() as rsps:
-        rsps.add(responses.POST, url, byte_data)
+    rsps.post(url, byte_data)
 
-        rest_api_client.export_package_to_file(topologies, str(file_path))
+    chunks = list(rest_api_client.export_package(["topology"], chunk_size=4))
 
-        assert file_path.read_bytes() == byte_data
-        assert len(rsps.calls) == 1
-        body = rsps.calls[0].request.body
+    assert chunks == [b"pack", b"age_", b"data"]
 
-    assert body.decode() == json.dumps({"TopologyNames": topologies})
 
+def test_export_package_to_file(rest_api_client, fake_files, rsps):
+    url = EXPORT_URL
+    byte_data = b"package_data"
+    file_path = "package.zip"
 
-def test_import_package_from_buffer(rest_api_client):
-    url = urljoin(API_URL, "Package/ImportPackage")
-    file_content = b"test_buffer"
-    buffer = io.BytesIO(file_content)
+    rsps.add(responses.POST, url, byte_data)
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(
-            url, json={"Success": True}, match=[file_matcher("file", file_content)]
-        )
+    rest_api_client.export_package_to_file(TOPOLOGIES, file_path)
 
-        rest_api_client.import_package_from_buffer(buffer)
+    assert fake_files[file_path] == byte_data
+    assert len(rsps.calls) == 1
+    body = rsps.calls[0].request.body
 
-        assert len(rsps.calls) == 1
+    assert body == EXPECTED_EXPORT_BODY
 
 
-@pytest.mark.parametrize(
-    ("status_code", "err_msg", "expected_err_class", "expected_err_text"),
-    (
-        (404, "", FeatureUnavailable, ""),
-        (500, "Internal server error", PackagingRestApiError, "Internal server error"),
-    ),
-)
-def test_import_package_from_buffer_fails(
-    status_code,
-    err_msg,
-    expected_err_class,
-    expected_err_text,
-    rest_api_client,
-):
-    url = urljoin(API_URL, "Package/ImportPackage")
+def test_import_package_from_buffer(rest_api_client, rsps):
+    url = IMPORT_URL
     file_content = b"test_buffer"
     buffer = io.BytesIO(file_content)
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(url, status=status_code, body=err_msg)
+    rsps.post(url, json={"Success": True}, match=[file_matcher("file", file_content)])
+
+    rest_api_client.import_package_from_buffer(buffer)
 
-        with pytest.raises(expected_err_class, match=expected_err_text):
-            rest_api_client.import_package_from_buffer(buffer)
+    assert len(rsps.calls) == 1
 
 
-def test_import_package(rest_api_client, tmp_path):
-    url = urljoin(API_URL, "Package/ImportPackage")
+def test_import_package(rest_api_client, fake_files, rsps):
+    url = IMPORT_URL
     file_content = b"test_buffer"
     file_name = "package.zip"
-    file_path = tmp_path / file_name
-    file_path.write_bytes(file_content)
+    fake_files[file_name] = file_content
 
-    with responses.RequestsMock() as rsps:
-        rsps.post(
-            url, json={"Success": True}, match=[file_matcher("file", file_content)]
-        )
+    rsps.post(url, json={"Success": True}, match=[file_matcher("file", file_content)])
 
-        rest_api_client.import_package(str(file_path))
+    rest_api_client.import_package(file_name)
 
-        assert len(rsps.calls) == 1
+    assert len(rsps.calls) == 1